@@ -3,6 +3,7 @@ import logging
 from pathlib import Path
 
 from stress.config import CONFIG
+from stress.sandbox import run_isolated
 from stress.swarm_app import run_swarm
 
 
@@ -21,7 +22,10 @@ def main():
     )
 
     logging.info("=== Starting LangGraph Swarm Stress Test ===")
-    run_swarm(CONFIG)
+    if CONFIG.get("isolation"):
+        run_isolated(CONFIG)
+    else:
+        run_swarm(CONFIG)
     logging.info("=== Finished LangGraph Swarm Stress Test ===")
 
 
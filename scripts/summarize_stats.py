@@ -0,0 +1,76 @@
+# scripts/summarize_stats.py
+import argparse
+import json
+from pathlib import Path
+
+from stress.analysis import aggregate_files
+
+
+def summarize_stats(
+    files,
+    workers=None,
+    resolution=1.0,
+    max_open=100_000,
+    merge="shards",
+    max_points=500,
+):
+    agg = aggregate_files(
+        files,
+        workers=workers,
+        merge=merge,
+        resolution_sec=resolution,
+        max_open=max_open,
+    )
+    return agg.summary(max_points=max_points)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Stream one or more stats logs into summary statistics"
+    )
+    parser.add_argument(
+        "files", type=Path, nargs="+", help="Stats files (.json, .ndjson, .csv)"
+    )
+    parser.add_argument(
+        "--workers", type=int, help="Parallel worker processes (default: CPU count)"
+    )
+    parser.add_argument(
+        "--resolution",
+        type=float,
+        default=1.0,
+        help="Concurrency bucket width in seconds",
+    )
+    parser.add_argument(
+        "--max-open",
+        type=int,
+        default=100_000,
+        help="Maximum unmatched agent_start/agent_stop entries kept in memory",
+    )
+    parser.add_argument(
+        "--merge",
+        choices=["shards", "runs"],
+        default="shards",
+        help="Treat files as shards of one run, or as separate runs",
+    )
+    parser.add_argument(
+        "--full-series",
+        action="store_true",
+        help="Report every concurrency bucket instead of a downsampled series",
+    )
+    parser.add_argument("--out", type=Path, help="Write summary JSON to this file")
+    args = parser.parse_args()
+
+    summary = summarize_stats(
+        args.files,
+        args.workers,
+        args.resolution,
+        args.max_open,
+        args.merge,
+        None if args.full_series else 500,
+    )
+    text = json.dumps(summary, indent=2)
+    if args.out:
+        args.out.write_text(text)
+        print(f"Summary saved to {args.out}")
+    else:
+        print(text)
@@ -1,11 +1,14 @@
 import time
 
 from langgraph.graph import StateGraph
-from typing_extensions import TypedDict
+from typing_extensions import NotRequired, TypedDict
 
 
 class AgentState(TypedDict):
     done: bool
+    # Set by spawn_pattern when the agent is dispatched (epoch seconds)
+    scheduled_sec: NotRequired[float]
+    dispatch_sec: NotRequired[float]
 
 
 class StubAgentGraph(StateGraph):
@@ -37,6 +40,8 @@ class StubAgentGraph(StateGraph):
                     "ttl": self.ttl,
                     "memory": self.mem_mb,
                     "time_sec": time.time(),
+                    "scheduled_sec": state.get("scheduled_sec"),
+                    "dispatch_sec": state.get("dispatch_sec"),
                 }
             )
 
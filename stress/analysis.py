@@ -0,0 +1,477 @@
+# stress/analysis.py
+import csv
+import json
+import logging
+import math
+import re
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+RESOURCE_FIELDS = ("cpu_percent", "mem_percent")
+PERCENTILES = (50, 90, 95, 99)
+
+_WHITESPACE = re.compile(r"\s*")
+_SEPARATORS = re.compile(r"[\s,]*")
+# An undecodable record is only retried with more data up to this much
+_MAX_PENDING_CHUNKS = 4
+_MIN_PENDING = 1 << 16
+
+
+class QuantileSketch:
+    """
+    Mergeable, fixed-accuracy quantile estimator.
+
+    Values are counted in logarithmic buckets so that every reported
+    percentile is within `relative_accuracy` of the true value, while memory
+    only grows with the dynamic range of the data, not with the sample count.
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zero = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value: float):
+        value = float(value)
+        if value > 1e-9:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self.positive[key] = self.positive.get(key, 0) + 1
+        elif value < -1e-9:
+            key = math.ceil(math.log(-value) / self._log_gamma)
+            self.negative[key] = self.negative.get(key, 0) + 1
+        else:
+            self.zero += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: "QuantileSketch"):
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for key, n in other.positive.items():
+            self.positive[key] = self.positive.get(key, 0) + n
+        for key, n in other.negative.items():
+            self.negative[key] = self.negative.get(key, 0) + n
+        self.zero += other.zero
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def _bucket_value(self, key: int) -> float:
+        return 2 * self.gamma**key / (self.gamma + 1)
+
+    def percentile(self, p: float):
+        if not self.count:
+            return None
+        rank = p / 100 * (self.count - 1)
+        seen = 0
+        # Walk buckets from the most negative value to the most positive
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return self._clamp(-self._bucket_value(key))
+        seen += self.zero
+        if seen > rank:
+            return self._clamp(0.0)
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._clamp(self._bucket_value(key))
+        return self.max
+
+    def _clamp(self, value: float) -> float:
+        return min(max(value, self.min), self.max)
+
+    def summary(self) -> dict:
+        if not self.count:
+            return {"count": 0}
+        out = {
+            "count": self.count,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.total / self.count,
+        }
+        for p in PERCENTILES:
+            out[f"p{p}"] = self.percentile(p)
+        return out
+
+
+class RunAggregator:
+    """
+    Single-pass reducer from a stream of stats events to summary statistics.
+
+    `agent_start` / `agent_stop` events are paired by `agent_id` through an
+    index of at most `max_open` unmatched entries; when the index is full the
+    oldest entry is evicted and counted as dropped, so memory stays bounded
+    however long the run is.
+
+    `run` labels the run these events belong to; it keeps agent ids and
+    concurrency apart when aggregators of different runs are merged.
+    """
+
+    def __init__(
+        self, run=None, resolution_sec=1.0, max_open=100_000, relative_accuracy=0.01
+    ):
+        self.run = run
+        self.resolution_sec = resolution_sec
+        self.max_open = max_open
+        self.relative_accuracy = relative_accuracy
+        self.open_starts = OrderedDict()  # agent_id -> start time
+        self.orphan_stops = OrderedDict()  # agent_id -> stop time
+        # time bucket -> [net starts - stops, highest running net within it]
+        self.concurrency_deltas = {}
+        self.other_runs = {}  # run label -> concurrency deltas of merged runs
+        self.lifetimes = QuantileSketch(relative_accuracy)
+        self.spawn_lag = QuantileSketch(relative_accuracy)
+        self.dispatch_lag = QuantileSketch(relative_accuracy)
+        self.start_lag = QuantileSketch(relative_accuracy)
+        self.spawn_jitter = QuantileSketch(relative_accuracy)
+        self._last_lag = None
+        self.resources = {
+            field: QuantileSketch(relative_accuracy) for field in RESOURCE_FIELDS
+        }
+        self.events = 0
+        self.starts = 0
+        self.stops = 0
+        self.dropped = 0
+
+    def add(self, event: dict):
+        self.events += 1
+        kind = event.get("event")
+        if kind == "agent_start":
+            self._on_start(event)
+        elif kind == "agent_stop":
+            self._on_stop(event)
+        elif kind == "stats_tick":
+            for field, sketch in self.resources.items():
+                if event.get(field) is not None:
+                    sketch.add(event[field])
+
+    def _bucket(self, t: float) -> int:
+        return math.floor(t / self.resolution_sec)
+
+    def _shift(self, t: float, delta: int):
+        """
+        Track the active count in event order. Besides each bucket's net
+        change we keep the highest point reached inside it, so agents that
+        start and stop within one bucket still show up in its peak.
+        """
+        bucket = self.concurrency_deltas.setdefault(self._bucket(t), [0, 0])
+        bucket[0] += delta
+        bucket[1] = max(bucket[1], bucket[0])
+
+    def _remember(self, index: OrderedDict, agent_id, t: float):
+        index[agent_id] = t
+        if len(index) > self.max_open:
+            index.popitem(last=False)
+            self.dropped += 1
+
+    def _on_start(self, event: dict):
+        t = event.get("time_sec")
+        if t is None:
+            return
+        self.starts += 1
+        self._shift(t, 1)
+        self._on_spawn_timing(event, t)
+
+        aid = event.get("agent_id")
+        if aid in self.orphan_stops:
+            self.lifetimes.add(self.orphan_stops.pop(aid) - t)
+        else:
+            self._remember(self.open_starts, aid, t)
+
+    def _on_spawn_timing(self, event: dict, t: float):
+        """
+        Split spawn lag into the load generator's share (scheduled -> dispatch)
+        and the swarm's share (dispatch -> first node execution). Jitter is the
+        change in total lag between consecutive starts.
+        """
+        scheduled = event.get("scheduled_sec")
+        dispatched = event.get("dispatch_sec")
+        if dispatched is not None:
+            self.start_lag.add(t - dispatched)
+            if scheduled is not None:
+                self.dispatch_lag.add(dispatched - scheduled)
+        if scheduled is not None:
+            lag = t - scheduled
+            self.spawn_lag.add(lag)
+            if self._last_lag is not None:
+                self.spawn_jitter.add(abs(lag - self._last_lag))
+            self._last_lag = lag
+
+    def _on_stop(self, event: dict):
+        t = event.get("time_sec")
+        if t is None:
+            return
+        self.stops += 1
+        self._shift(t, -1)
+
+        aid = event.get("agent_id")
+        if aid in self.open_starts:
+            self.lifetimes.add(t - self.open_starts.pop(aid))
+        else:
+            self._remember(self.orphan_stops, aid, t)
+
+    def merge(self, other: "RunAggregator", same_run=True) -> "RunAggregator":
+        """
+        Fold another aggregator into this one.
+
+        With `same_run` the other aggregator is a shard of this run: agents
+        are paired by `agent_id` across shards and concurrency is summed.
+        Otherwise it is a separate run whose agent ids and concurrency are
+        kept apart under its `run` label.
+        """
+        self.events += other.events
+        self.starts += other.starts
+        self.stops += other.stops
+        self.dropped += other.dropped
+        self.lifetimes.merge(other.lifetimes)
+        self.spawn_lag.merge(other.spawn_lag)
+        self.dispatch_lag.merge(other.dispatch_lag)
+        self.start_lag.merge(other.start_lag)
+        self.spawn_jitter.merge(other.spawn_jitter)
+        for field, sketch in other.resources.items():
+            self.resources.setdefault(
+                field, QuantileSketch(self.relative_accuracy)
+            ).merge(sketch)
+        for run, deltas in other.other_runs.items():
+            self._merge_deltas(self.other_runs.setdefault(run, {}), deltas)
+
+        if not same_run:
+            if other.concurrency_deltas:
+                self._merge_deltas(
+                    self.other_runs.setdefault(other.run, {}),
+                    other.concurrency_deltas,
+                )
+            # Ids are only unique within a run, so unmatched entries can
+            # never pair with this aggregator's
+            for aid, t in other.open_starts.items():
+                self._remember(self.open_starts, (other.run, aid), t)
+            for aid, t in other.orphan_stops.items():
+                self._remember(self.orphan_stops, (other.run, aid), t)
+            return self
+
+        self._merge_deltas(self.concurrency_deltas, other.concurrency_deltas)
+
+        # Agents whose start and stop landed in different shards
+        for aid, t in other.open_starts.items():
+            if aid in self.orphan_stops:
+                self.lifetimes.add(self.orphan_stops.pop(aid) - t)
+            else:
+                self._remember(self.open_starts, aid, t)
+        for aid, t in other.orphan_stops.items():
+            if aid in self.open_starts:
+                self.lifetimes.add(t - self.open_starts.pop(aid))
+            else:
+                self._remember(self.orphan_stops, aid, t)
+        return self
+
+    @staticmethod
+    def _merge_deltas(into: dict, deltas: dict):
+        # Shards interleave in unknown order, so summing their in-bucket
+        # highs gives an upper bound on the combined bucket peak
+        for key, (net, high) in deltas.items():
+            bucket = into.setdefault(key, [0, 0])
+            bucket[0] += net
+            bucket[1] += high
+
+    def concurrency(self, deltas=None) -> list:
+        """Return [(bucket_start_sec, peak_active_agents), ...] in time order."""
+        if deltas is None:
+            deltas = self.concurrency_deltas
+        series = []
+        active = 0
+        for key in sorted(deltas):
+            net, high = deltas[key]
+            series.append((key * self.resolution_sec, active + high))
+            active += net
+        return series
+
+    def _runs(self) -> dict:
+        runs = dict(self.other_runs)
+        if self.concurrency_deltas:
+            runs[self.run] = self.concurrency_deltas
+        return runs
+
+    def summary(self, max_points=500) -> dict:
+        """
+        Summarize everything seen so far. Concurrency series are downsampled
+        to at most `max_points` entries, keeping the peak of each group;
+        pass None for the full series.
+        """
+        runs = {}
+        for run, deltas in self._runs().items():
+            series = self.concurrency(deltas)
+            runs[run] = {
+                "peak_concurrency": max((n for _, n in series), default=0),
+                "concurrency": _downsample(series, max_points),
+            }
+        out = {
+            "events": self.events,
+            "agent_starts": self.starts,
+            "agent_stops": self.stops,
+            "unmatched_starts": len(self.open_starts),
+            "unmatched_stops": len(self.orphan_stops),
+            "dropped_from_index": self.dropped,
+            "lifetime_sec": self.lifetimes.summary(),
+            "spawn_lag_sec": self.spawn_lag.summary(),
+            "dispatch_lag_sec": self.dispatch_lag.summary(),
+            "start_lag_sec": self.start_lag.summary(),
+            "spawn_jitter_sec": self.spawn_jitter.summary(),
+            "peak_concurrency": max(
+                (r["peak_concurrency"] for r in runs.values()), default=0
+            ),
+            "resources": {
+                field: sketch.summary() for field, sketch in self.resources.items()
+            },
+        }
+        if len(runs) == 1:
+            out["concurrency"] = next(iter(runs.values()))["concurrency"]
+        elif runs:
+            out["runs"] = {str(run): r for run, r in runs.items()}
+        else:
+            out["concurrency"] = []
+        return out
+
+
+def _downsample(series: list, max_points) -> list:
+    """Group consecutive buckets, keeping each group's start and peak"""
+    if max_points is None or len(series) <= max_points:
+        return series
+    step = math.ceil(len(series) / max_points)
+    return [
+        (series[i][0], max(n for _, n in series[i : i + step]))
+        for i in range(0, len(series), step)
+    ]
+
+
+def _coerce(value: str):
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def _iter_csv(f):
+    for row in csv.DictReader(f):
+        # StatsMonitor writes the union of all keys, so absent fields are ""
+        yield {k: _coerce(v) for k, v in row.items() if v not in ("", None)}
+
+
+def _refill(buf: str, pos: int, chunk: str) -> str:
+    """Drop the consumed prefix and append the next chunk"""
+    return buf[pos:] + chunk
+
+
+def _iter_json_array(f, chunk_size):
+    """
+    Incrementally decode the objects of a top-level JSON array.
+
+    Decoding works on an index into the buffer; the consumed prefix is only
+    dropped when the next chunk is read, so each byte is copied O(1) times.
+    """
+    decoder = json.JSONDecoder()
+    max_pending = max(_MAX_PENDING_CHUNKS * chunk_size, _MIN_PENDING)
+    buf = ""
+    pos = 0
+    eof = False
+    started = False
+    while True:
+        pos = (_SEPARATORS if started else _WHITESPACE).match(buf, pos).end()
+        if pos < len(buf):
+            if not started:
+                if buf[pos] != "[":
+                    raise ValueError("Expected a JSON array")
+                pos += 1
+                started = True
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                obj, pos = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # Most likely an object split across chunks; a corrupt record
+                # would otherwise pull the rest of the file into the buffer
+                if eof or len(buf) - pos > max_pending:
+                    raise
+            else:
+                yield obj
+                continue
+        if eof:
+            if started:
+                raise ValueError("Unterminated JSON array")
+            return
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+        buf = _refill(buf, pos, chunk)
+        pos = 0
+
+
+def iter_events(path, chunk_size=1 << 20):
+    """
+    Stream events from a stats file without loading it into memory.
+
+    Supports NDJSON (`.ndjson` / `.jsonl`), CSV, and the JSON array written
+    by StatsMonitor.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    with open(path, newline="" if suffix == ".csv" else None) as f:
+        if suffix == ".csv":
+            yield from _iter_csv(f)
+        elif suffix in (".ndjson", ".jsonl"):
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        else:
+            yield from _iter_json_array(f, chunk_size)
+
+
+def aggregate_file(path, **kwargs) -> RunAggregator:
+    agg = RunAggregator(run=str(path), **kwargs)
+    for event in iter_events(path):
+        agg.add(event)
+    logging.info(f"[Analysis] Aggregated {agg.events} events from {path}")
+    return agg
+
+
+def aggregate_files(paths, workers=None, merge="shards", **kwargs) -> RunAggregator:
+    """
+    Aggregate files one per process and merge the partial results.
+
+    merge="shards" treats the files as pieces of a single run (agents are
+    paired across files, concurrency is summed); merge="runs" treats each
+    file as its own run and reports concurrency per run.
+    """
+    if merge not in ("shards", "runs"):
+        raise ValueError(f"Unknown merge mode '{merge}'")
+    same_run = merge == "shards"
+    paths = [Path(p) for p in paths]
+    total = RunAggregator(**kwargs)
+    if workers == 1 or len(paths) <= 1:
+        for p in paths:
+            total.merge(aggregate_file(p, **kwargs), same_run=same_run)
+        return total
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(aggregate_file, p, **kwargs) for p in paths]
+        for future in futures:
+            total.merge(future.result(), same_run=same_run)
+    return total
@@ -10,4 +10,7 @@ CONFIG = {
     "log_level": "INFO",
     "stats_interval": 5,  # seconds
     "log_dir": "logs",  # where to save CSV/JSON
+    # Run in a resource-limited child process, e.g.
+    # {"mode": "auto", "memory_mb": 2048, "cpus": 2, "max_procs": 512}
+    "isolation": None,
 }
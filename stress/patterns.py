@@ -3,6 +3,17 @@ import logging
 import time
 
 
+def _dispatch(agent, scheduled_sec):
+    """
+    Invoke an agent, passing along when it was meant to start and when it was
+    actually handed to the swarm. Both are epoch seconds so they line up with
+    the agent's own `agent_start` time.
+    """
+    agent["entrypoint"].invoke(
+        {"scheduled_sec": scheduled_sec, "dispatch_sec": time.time()}
+    )
+
+
 def spawn_pattern(workflow, config):
     """
     Spawn agents according to the pattern in config.
@@ -11,6 +22,8 @@ def spawn_pattern(workflow, config):
         "pattern": {"type": ..., "params": ...},
         "num_agents": ...,
     }
+    Every agent is invoked with its scheduled and dispatch time so spawn lag
+    can be measured against the pattern's intended timeline.
     """
     pattern = config.get("pattern", {"type": "all_at_once"})
     pattern_type = pattern.get("type", "all_at_once")
@@ -25,11 +38,13 @@ def spawn_pattern(workflow, config):
             # The value is a StateNodeSpec, the runnable is at .runnable
             agents_list.append({"id": name, "entrypoint": agent_node_spec.runnable})
 
+    t0 = time.time()
+
     if pattern_type == "all_at_once":
         logging.info(f"[Swarm] Launching all {len(agents_list)} agents at once")
         for agent in agents_list:
             # call agent entrypoint asynchronously if needed
-            agent["entrypoint"].invoke({})
+            _dispatch(agent, t0)
 
     elif pattern_type == "bursts":
         burst_size = params.get("agents_per_burst", 5)
@@ -38,10 +53,10 @@ def spawn_pattern(workflow, config):
             f"[Swarm] Launching agents in bursts: {burst_size} every {interval}s"
         )
 
-        for i in range(0, len(agents_list), burst_size):
+        for burst, i in enumerate(range(0, len(agents_list), burst_size)):
             batch = agents_list[i : i + burst_size]
             for agent in batch:
-                agent["entrypoint"].invoke({})
+                _dispatch(agent, t0 + burst * interval)
             time.sleep(interval)
 
     elif pattern_type == "linear":
@@ -54,7 +69,7 @@ def spawn_pattern(workflow, config):
         )
 
         for idx, agent in enumerate(agents_list):
-            agent["entrypoint"].invoke({})
+            _dispatch(agent, t0 + start_time + idx * interval)
             time.sleep(interval)
 
     else:
@@ -62,4 +77,4 @@ def spawn_pattern(workflow, config):
             f"[Swarm] Unknown pattern type '{pattern_type}', defaulting to all_at_once"
         )
         for agent in agents_list:
-            agent["entrypoint"].invoke({})
+            _dispatch(agent, t0)
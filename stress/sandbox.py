@@ -0,0 +1,423 @@
+# stress/sandbox.py
+import errno
+import json
+import logging
+import multiprocessing as mp
+import os
+import resource
+import signal
+import time
+from pathlib import Path
+
+import psutil
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+MEMORY_ERROR_EXIT = 3  # child exit code when an allocation hits RLIMIT_AS
+SPAWN_FAILED_EXIT = 4  # child exit code when a thread or process can't be created
+LIMIT_OUTCOMES = ("memory_limit", "oom_killed", "proc_limit")
+
+
+def cgroup_v2_available() -> bool:
+    return (CGROUP_ROOT / "cgroup.controllers").exists()
+
+
+def _read_kv(path: Path) -> dict:
+    """Parse cgroup files such as memory.events / cpu.stat into a dict"""
+    try:
+        lines = path.read_text().splitlines()
+    except OSError:
+        return {}
+    out = {}
+    for line in lines:
+        key, _, value = line.partition(" ")
+        if value.strip().isdigit():
+            out[key] = int(value)
+    return out
+
+
+def _read_int(path: Path):
+    try:
+        return int(path.read_text().strip())
+    except (OSError, ValueError):
+        return None
+
+
+class CgroupUnavailable(RuntimeError):
+    """No cgroup v2 group with the required controllers could be set up"""
+
+
+def _own_cgroup() -> str:
+    for line in Path("/proc/self/cgroup").read_text().splitlines():
+        if line.startswith("0::"):
+            return line[3:]
+    raise CgroupUnavailable("Process is not in a cgroup v2 hierarchy")
+
+
+def _read_words(path: Path) -> set:
+    try:
+        return set(path.read_text().split())
+    except OSError:
+        return set()
+
+
+class CgroupLimits:
+    """
+    A throwaway cgroup v2 group carrying memory.max / cpu.max / pids.max.
+    The child process is moved into it by the parent before the run starts.
+
+    Limit files only appear in a group when its parent has the controllers
+    enabled in cgroup.subtree_control, and v2 refuses to enable them on a
+    non-root group that still holds processes (such as our own). So the group
+    is created under the nearest ancestor that already delegates the
+    controllers, or under one where they can be enabled: the root, or an
+    ancestor with no processes of its own. Controllers enabled that way are
+    disabled again by remove().
+    """
+
+    def __init__(self, memory_mb=None, cpus=None, max_procs=None):
+        self.memory_mb = memory_mb
+        self.cpus = cpus
+        self.max_procs = max_procs
+        # memory is always needed for OOM detection via memory.events
+        self.controllers = {"memory"}
+        if cpus:
+            self.controllers.add("cpu")
+        if max_procs:
+            self.controllers.add("pids")
+        self.path = None
+        self._enabled = None  # (group, controllers) we enabled and must undo
+
+    def _find_base(self) -> Path:
+        own = CGROUP_ROOT / _own_cgroup().lstrip("/")
+        ancestors = [p for p in own.parents if CGROUP_ROOT in (p, *p.parents)]
+        for base in [own, *ancestors]:
+            missing = self.controllers - _read_words(base / "cgroup.subtree_control")
+            if not missing:
+                return base
+            available = _read_words(base / "cgroup.controllers")
+            has_procs = bool(_read_words(base / "cgroup.procs"))
+            if self.controllers <= available and (
+                base == CGROUP_ROOT or not has_procs
+            ):
+                enable = " ".join(f"+{c}" for c in sorted(missing))
+                try:
+                    (base / "cgroup.subtree_control").write_text(enable)
+                except OSError as e:
+                    logging.debug(f"[Sandbox] Cannot enable {enable} in {base}: {e}")
+                    continue
+                self._enabled = (base, missing)
+                return base
+        raise CgroupUnavailable(
+            f"No cgroup above {own} delegates {sorted(self.controllers)}"
+        )
+
+    def create(self):
+        base = self._find_base()
+        self.path = base / f"swarm-stress-{os.getpid()}"
+        try:
+            self.path.mkdir()
+        except OSError as e:
+            self._restore_controllers()
+            raise CgroupUnavailable(f"Cannot create {self.path}: {e}") from e
+        try:
+            if self.memory_mb:
+                (self.path / "memory.max").write_text(str(self.memory_mb << 20))
+                # Fail fast instead of swapping the host
+                swap = self.path / "memory.swap.max"
+                if swap.exists():
+                    swap.write_text("0")
+            if self.cpus:
+                period = 100_000
+                quota = int(self.cpus * period)
+                (self.path / "cpu.max").write_text(f"{quota} {period}")
+            if self.max_procs:
+                (self.path / "pids.max").write_text(str(self.max_procs))
+        except OSError as e:
+            self.remove()
+            raise CgroupUnavailable(f"Cannot set limits in {self.path}: {e}") from e
+
+    def join(self, pid: int):
+        (self.path / "cgroup.procs").write_text(str(pid))
+
+    def counters(self) -> dict:
+        events = _read_kv(self.path / "memory.events")
+        cpu = _read_kv(self.path / "cpu.stat")
+        pids = _read_kv(self.path / "pids.events")
+        return {
+            "oom_kills": events.get("oom_kill", 0),
+            "memory_max_events": events.get("max", 0),
+            "pids_max_events": pids.get("max", 0),
+            "cpu_throttled_periods": cpu.get("nr_throttled", 0),
+            "cpu_throttled_sec": cpu.get("throttled_usec", 0) / 1e6,
+            "memory_peak_mb": (_read_int(self.path / "memory.peak") or 0) / 2**20,
+        }
+
+    def remove(self):
+        try:
+            self.path.rmdir()
+        except OSError as e:
+            logging.warning(f"[Sandbox] Could not remove cgroup {self.path}: {e}")
+        self._restore_controllers()
+
+    def _restore_controllers(self):
+        """Undo any subtree_control change made by _find_base"""
+        if not self._enabled:
+            return
+        base, controllers = self._enabled
+        disable = " ".join(f"-{c}" for c in sorted(controllers))
+        try:
+            (base / "cgroup.subtree_control").write_text(disable)
+        except OSError as e:
+            logging.warning(f"[Sandbox] Could not restore {base} ({disable}): {e}")
+        self._enabled = None
+
+
+def _apply_rlimits(memory_mb=None, max_procs=None):
+    if memory_mb:
+        limit = memory_mb << 20
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    if max_procs:
+        # Linux counts threads against RLIMIT_NPROC as well, per real UID
+        resource.setrlimit(resource.RLIMIT_NPROC, (max_procs, max_procs))
+
+
+def _child_main(config, limits, go, use_rlimits, started, active):
+    # The parent moves us into the cgroup (or decides on rlimits) first
+    go.wait()
+    if use_rlimits.value:
+        _apply_rlimits(limits.get("memory_mb"), limits.get("max_procs"))
+
+    def on_event(event):
+        kind = event.get("event")
+        if kind == "agent_start":
+            with started.get_lock():
+                started.value += 1
+            with active.get_lock():
+                active.value += 1
+        elif kind == "agent_stop":
+            with active.get_lock():
+                active.value -= 1
+
+    # Imported here so the parent never loads the swarm stack
+    from stress.swarm_app import run_swarm
+
+    try:
+        run_swarm(config, on_event=on_event)
+    except MemoryError:
+        logging.error("[Sandbox] Allocation failed under RLIMIT_AS")
+        os._exit(MEMORY_ERROR_EXIT)
+    except (RuntimeError, OSError) as e:
+        if not _is_spawn_failure(e, limits):
+            raise
+        logging.error(f"[Sandbox] Thread/process creation failed: {e}")
+        os._exit(SPAWN_FAILED_EXIT)
+
+
+def _is_spawn_failure(e: Exception, limits: dict) -> bool:
+    """
+    True for errors raised when a thread or process can't be created. Which
+    limit caused it is decided by classify_exit: under RLIMIT_AS a new
+    thread's stack can fail just like a process-count limit.
+    """
+    if isinstance(e, RuntimeError):
+        return "can't start new thread" in str(e)
+    # EAGAIN is also plain non-blocking I/O; only fork failures matter here
+    return bool(limits.get("max_procs")) and e.errno == errno.EAGAIN
+
+
+def _tree_rss_mb(proc: psutil.Process) -> float:
+    try:
+        procs = [proc] + proc.children(recursive=True)
+    except psutil.NoSuchProcess:
+        return 0.0
+    rss = 0
+    for p in procs:
+        try:
+            rss += p.memory_info().rss
+        except psutil.NoSuchProcess:
+            pass
+    return rss / 2**20
+
+
+def classify_exit(exitcode, oom_kills=0, limits=None, pids_max_events=None) -> str:
+    """
+    Map the child's exit code to an outcome. `pids_max_events` is the cgroup
+    pids.events counter, or None in rlimit mode.
+    """
+    limits = limits or {}
+    if exitcode == 0:
+        return "completed"
+    if exitcode == MEMORY_ERROR_EXIT:
+        return "memory_limit"
+    if exitcode == SPAWN_FAILED_EXIT:
+        if limits.get("max_procs") and (pids_max_events is None or pids_max_events):
+            return "proc_limit"
+        if limits.get("memory_mb"):
+            return "memory_limit"
+        return "failed"
+    if exitcode == -signal.SIGKILL and oom_kills:
+        return "oom_killed"
+    if exitcode == -signal.SIGKILL:
+        return "killed"
+    return "failed"
+
+
+def run_isolated(config):
+    """
+    Run run_swarm in a child process under resource limits.
+
+    config["isolation"]: {
+        "mode": "auto" | "cgroup" | "rlimit",
+        "memory_mb": ...,   # memory.max or RLIMIT_AS
+        "cpus": ...,        # cpu.max, cgroup only
+        "max_procs": ...,   # pids.max or RLIMIT_NPROC
+        "sample_interval": ...,
+    }
+    "auto" uses a cgroup v2 group when one can be set up and falls back to
+    rlimits; "cgroup" raises CgroupUnavailable instead of falling back.
+    Note RLIMIT_AS caps virtual, not resident, memory, so it trips earlier
+    than a container memory limit would. RLIMIT_NPROC counts every process
+    and thread of the real UID across the whole host, not just this run, and
+    is ignored for root; prefer pids.max (cgroup mode) to cap the run itself.
+
+    Returns a report with the outcome, peak RSS, OOM/throttling counters and
+    the agent count and RSS at the last sample before the limit was hit.
+    """
+    limits = config.get("isolation") or {}
+    mode = limits.get("mode", "auto")
+    interval = limits.get("sample_interval", 0.5)
+
+    cgroup = None
+    if mode in ("auto", "cgroup"):
+        try:
+            if not cgroup_v2_available():
+                raise CgroupUnavailable("cgroup v2 is not mounted")
+            cgroup = CgroupLimits(
+                limits.get("memory_mb"), limits.get("cpus"), limits.get("max_procs")
+            )
+            cgroup.create()
+        except CgroupUnavailable as e:
+            if mode == "cgroup":
+                raise
+            logging.warning(f"[Sandbox] {e}, using rlimits")
+            cgroup = None
+    elif mode != "rlimit":
+        logging.warning(f"[Sandbox] Unknown isolation mode '{mode}', using rlimits")
+    if cgroup is None and limits.get("cpus"):
+        logging.warning("[Sandbox] CPU limits need cgroup v2, ignoring 'cpus'")
+
+    started = mp.Value("i", 0)
+    active = mp.Value("i", 0)
+    go = mp.Event()
+    use_rlimits = mp.Value("b", cgroup is None)
+    child = mp.Process(
+        target=_child_main, args=(config, limits, go, use_rlimits, started, active)
+    )
+    start_time = time.time()
+    peak_rss = 0.0
+    last = {"time_sec": 0.0, "agents_started": 0, "agents_active": 0, "rss_mb": 0.0}
+    interrupted = False
+    try:
+        child.start()
+        if cgroup:
+            try:
+                cgroup.join(child.pid)
+            except OSError as e:
+                if mode == "cgroup":
+                    raise CgroupUnavailable(
+                        f"Cannot move run into {cgroup.path}: {e}"
+                    ) from e
+                logging.warning(f"[Sandbox] Cannot join cgroup ({e}), using rlimits")
+                cgroup.remove()
+                cgroup = None
+                use_rlimits.value = True
+        logging.info(
+            f"[Sandbox] Starting isolated run ({'cgroup' if cgroup else 'rlimit'}) "
+            f"with limits {limits}"
+        )
+        go.set()
+
+        proc = psutil.Process(child.pid)
+        while child.is_alive():
+            rss = _tree_rss_mb(proc)
+            if rss:
+                peak_rss = max(peak_rss, rss)
+                last = {
+                    "time_sec": round(time.time() - start_time, 1),
+                    "agents_started": started.value,
+                    "agents_active": active.value,
+                    "rss_mb": round(rss, 1),
+                }
+            child.join(interval)
+    except BaseException:
+        interrupted = True
+        raise
+    finally:
+        _stop_child(child)
+        counters = cgroup.counters() if cgroup else {}
+        if cgroup:
+            cgroup.remove()
+        # Only runs that actually started get a report
+        if go.is_set():
+            outcome = classify_exit(
+                child.exitcode,
+                counters.get("oom_kills", 0),
+                limits,
+                counters.get("pids_max_events") if cgroup else None,
+            )
+            if interrupted:
+                outcome = "interrupted"
+            report = {
+                "outcome": outcome,
+                "mode": "cgroup" if cgroup else "rlimit",
+                "limits": limits,
+                "exitcode": child.exitcode,
+                "duration_sec": round(time.time() - start_time, 1),
+                "agents_started": started.value,
+                "peak_rss_mb": round(peak_rss, 1),
+                **counters,
+                "limit_hit": last if outcome in LIMIT_OUTCOMES else None,
+            }
+            _log_report(report, last)
+            _save_report(report, config.get("log_dir", "logs"))
+    return report
+
+
+def _stop_child(child: mp.Process):
+    if not child.is_alive():
+        return
+    child.terminate()
+    child.join(5)
+    if child.is_alive():
+        child.kill()
+        child.join()
+
+
+def _log_report(report, last):
+    outcome = report["outcome"]
+    if outcome == "completed":
+        logging.info(f"[Sandbox] Run completed, peak RSS {report['peak_rss_mb']}MB")
+    elif outcome in LIMIT_OUTCOMES:
+        logging.warning(
+            f"[Sandbox] Run hit '{outcome}' at "
+            f"{last['agents_active']} active / {last['agents_started']} started "
+            f"agents, RSS {last['rss_mb']}MB"
+        )
+    else:
+        logging.error(
+            f"[Sandbox] Run ended with '{outcome}' (exit code {report['exitcode']})"
+        )
+    if report.get("cpu_throttled_periods"):
+        logging.info(
+            f"[Sandbox] CPU throttled in {report['cpu_throttled_periods']} periods "
+            f"({report['cpu_throttled_sec']:.1f}s)"
+        )
+
+
+def _save_report(report, outdir):
+    outdir = Path(outdir)
+    outdir.mkdir(parents=True, exist_ok=True)
+    path = outdir / f"sandbox_{time.strftime('%Y%m%d-%H%M%S')}.json"
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    logging.info(f"[Sandbox] Saved report to {path}")
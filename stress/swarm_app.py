@@ -5,6 +5,7 @@ import time
 from langgraph_swarm import create_swarm
 
 from stress.agent_stub_graph import StubAgentGraph
+from stress.analysis import RunAggregator
 from stress.patterns import spawn_pattern
 from stress.stats import StatsMonitor
 
@@ -19,7 +20,30 @@ def build_agents(config):
     return agents
 
 
-def run_swarm(config):
+def log_spawn_accuracy(records):
+    """Summarize scheduled-vs-actual launch lag and jitter for the run"""
+    agg = RunAggregator()
+    for rec in records:
+        agg.add(rec)
+    summary = agg.summary()
+
+    for key, label in (
+        ("dispatch_lag_sec", "Dispatch lag (scheduled -> dispatch)"),
+        ("start_lag_sec", "Start lag (dispatch -> first node)"),
+        ("spawn_lag_sec", "Spawn lag (scheduled -> first node)"),
+        ("spawn_jitter_sec", "Spawn jitter"),
+    ):
+        s = summary[key]
+        if not s["count"]:
+            continue
+        logging.info(
+            f"[Swarm] {label}: p50={s['p50']:.3f}s p90={s['p90']:.3f}s "
+            f"p99={s['p99']:.3f}s max={s['max']:.3f}s"
+        )
+    return summary
+
+
+def run_swarm(config, on_event=None):
     logging.info(f"[Swarm] Starting with {config['num_agents']} agents")
 
     agents = build_agents(config)
@@ -30,9 +54,14 @@ def run_swarm(config):
         outdir=config.get("log_dir", "logs"),
     )
 
+    def log_event(event):
+        stats.log_event(event)
+        if on_event:
+            on_event(event)
+
     # Set event logger for each agent
     for agent in agents:
-        agent.event_logger = stats.log_event
+        agent.event_logger = log_event
 
     # Create LangGraph swarm workflow using proper agent objects
     workflow = create_swarm(
@@ -52,4 +81,5 @@ def run_swarm(config):
         time.sleep(1)
 
     stats.stop()
+    log_spawn_accuracy(stats.records)
     logging.info("[Swarm] Finished all agents")
@@ -0,0 +1,258 @@
+# tests/test_analysis.py
+import csv
+import io
+import json
+
+import pytest
+
+from stress.analysis import (
+    QuantileSketch,
+    RunAggregator,
+    _iter_json_array,
+    _refill,
+    aggregate_files,
+    iter_events,
+)
+
+EVENTS = [
+    {"event": "stats_tick", "time_sec": 0.0, "cpu_percent": 10.0, "mem_percent": 5},
+    {"event": "agent_start", "agent_id": 0, "time_sec": 1.0},
+    {"event": "agent_start", "agent_id": 1, "time_sec": 2.0},
+    {"event": "stats_tick", "time_sec": 5.0, "cpu_percent": 30.0, "mem_percent": 7},
+    {"event": "agent_stop", "agent_id": 0, "time_sec": 4.0},
+    {"event": "agent_stop", "agent_id": 1, "time_sec": 10.0},
+]
+
+
+@pytest.fixture
+def event_files(tmp_path):
+    """Write EVENTS in every supported format."""
+    json_path = tmp_path / "stats.json"
+    json_path.write_text(json.dumps(EVENTS, indent=2))
+
+    ndjson_path = tmp_path / "stats.ndjson"
+    ndjson_path.write_text("\n".join(json.dumps(e) for e in EVENTS) + "\n")
+
+    csv_path = tmp_path / "stats.csv"
+    keys = sorted({k for e in EVENTS for k in e})
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=keys)
+        writer.writeheader()
+        writer.writerows(EVENTS)
+
+    return {"json": json_path, "ndjson": ndjson_path, "csv": csv_path}
+
+
+@pytest.mark.parametrize("fmt", ["json", "ndjson", "csv"])
+def test_iter_events_formats(event_files, fmt):
+    """Test that every file format yields the same events."""
+    assert list(iter_events(event_files[fmt])) == EVENTS
+
+
+def test_iter_events_json_small_chunks(event_files):
+    """Test that the JSON array reader handles objects split across chunks."""
+    assert list(iter_events(event_files["json"], chunk_size=7)) == EVENTS
+
+
+def test_iter_events_json_many_small_objects(monkeypatch):
+    """Test that the default chunk size copies each byte O(1) times."""
+    events = [{"event": "stats_tick", "time_sec": i} for i in range(50_000)]
+    data = json.dumps(events, indent=2)
+    copied = []
+
+    def refill(buf, pos, chunk):
+        copied.append(len(buf) - pos + len(chunk))
+        return _refill(buf, pos, chunk)
+
+    monkeypatch.setattr("stress.analysis._refill", refill)
+    streamed = list(_iter_json_array(io.StringIO(data), chunk_size=1 << 20))
+
+    assert streamed == events
+    # One compaction per chunk read, never one per decoded object
+    assert len(copied) <= len(data) // (1 << 20) + 2
+    assert sum(copied) < 2 * len(data)
+
+
+class CountingReader(io.StringIO):
+    """StringIO that counts read() calls."""
+
+    reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return super().read(size)
+
+
+def test_iter_events_json_corrupt_record_fails_early():
+    """Test that a corrupt record raises instead of buffering the whole file."""
+    events = [{"event": "stats_tick", "time_sec": i} for i in range(2000)]
+    good = json.dumps(events)[1:-1]
+    data = f"[{good}, {{\"event\": oops}}, {good}, {good}, {good}, {good}]"
+    f = CountingReader(data)
+
+    with pytest.raises(json.JSONDecodeError):
+        list(_iter_json_array(f, chunk_size=256))
+
+    # Gave up well before reading the remaining ~4/5 of the file
+    assert f.reads * 256 < len(data) / 2
+
+
+def test_quantile_sketch_accuracy():
+    """Test that percentiles stay within the relative accuracy."""
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    for v in range(1, 1001):
+        sketch.add(v)
+
+    assert sketch.count == 1000
+    assert sketch.min == 1
+    assert sketch.max == 1000
+    assert sketch.percentile(50) == pytest.approx(500, rel=0.02)
+    assert sketch.percentile(99) == pytest.approx(990, rel=0.02)
+
+
+def test_quantile_sketch_merge():
+    """Test that merging two sketches matches a single combined sketch."""
+    a, b, combined = QuantileSketch(), QuantileSketch(), QuantileSketch()
+    for v in range(-50, 50):
+        (a if v % 2 else b).add(v)
+        combined.add(v)
+
+    a.merge(b)
+    assert a.summary() == combined.summary()
+
+
+def test_run_aggregator_summary():
+    """Test lifetimes, concurrency and resource stats from one pass."""
+    agg = RunAggregator(resolution_sec=1.0)
+    for event in EVENTS:
+        agg.add(event)
+
+    summary = agg.summary()
+    assert summary["agent_starts"] == 2
+    assert summary["agent_stops"] == 2
+    assert summary["unmatched_starts"] == 0
+    assert summary["lifetime_sec"]["min"] == 3.0
+    assert summary["lifetime_sec"]["max"] == 8.0
+    assert summary["peak_concurrency"] == 2
+    # Each bucket reports its peak, including agents still active when it began
+    assert summary["concurrency"] == [(1.0, 1), (2.0, 2), (4.0, 2), (10.0, 1)]
+    assert summary["resources"]["cpu_percent"]["max"] == 30.0
+
+
+def test_run_aggregator_agents_shorter_than_a_bucket():
+    """Test that agents starting and stopping in one bucket are counted."""
+    agg = RunAggregator(resolution_sec=1.0)
+    for i in range(5):
+        agg.add({"event": "agent_start", "agent_id": i, "time_sec": i + 0.1})
+        agg.add({"event": "agent_stop", "agent_id": i, "time_sec": i + 0.6})
+
+    summary = agg.summary()
+    assert summary["lifetime_sec"]["count"] == 5
+    assert summary["peak_concurrency"] == 1
+    assert [n for _, n in summary["concurrency"]] == [1] * 5
+
+
+def test_run_aggregator_spawn_lag():
+    """Test that spawn lag is measured against scheduled_sec."""
+    agg = RunAggregator()
+    agg.add(
+        {"event": "agent_start", "agent_id": 0, "time_sec": 1.5, "scheduled_sec": 1.0}
+    )
+
+    assert agg.spawn_lag.summary()["max"] == 0.5
+
+
+def test_run_aggregator_bounded_index():
+    """Test that the unmatched index never exceeds max_open."""
+    agg = RunAggregator(max_open=2)
+    for i in range(5):
+        agg.add({"event": "agent_start", "agent_id": i, "time_sec": float(i)})
+
+    assert len(agg.open_starts) == 2
+    assert agg.dropped == 3
+    assert list(agg.open_starts) == [3, 4]
+
+
+def test_run_aggregator_merge_pairs_across_shards():
+    """Test that a start and stop in different shards are paired on merge."""
+    first, second = RunAggregator(), RunAggregator()
+    first.add({"event": "agent_start", "agent_id": 7, "time_sec": 1.0})
+    second.add({"event": "agent_stop", "agent_id": 7, "time_sec": 6.0})
+
+    first.merge(second)
+    assert first.lifetimes.summary()["max"] == 5.0
+    assert not first.open_starts
+    assert not first.orphan_stops
+
+
+def test_aggregate_files_parallel(event_files):
+    """Test aggregating several files across worker processes."""
+    paths = [event_files["json"], event_files["ndjson"]]
+    agg = aggregate_files(paths, workers=2)
+
+    assert agg.starts == 4
+    assert agg.lifetimes.count == 4
+
+
+def test_run_aggregator_spawn_breakdown():
+    """Test dispatch/start lag split and jitter between consecutive starts."""
+    agg = RunAggregator()
+    for aid, (scheduled, dispatched, started) in enumerate(
+        [(0.0, 0.0, 0.5), (1.0, 1.5, 2.0), (2.0, 2.0, 2.5)]
+    ):
+        agg.add(
+            {
+                "event": "agent_start",
+                "agent_id": aid,
+                "time_sec": started,
+                "scheduled_sec": scheduled,
+                "dispatch_sec": dispatched,
+            }
+        )
+
+    summary = agg.summary()
+    assert summary["dispatch_lag_sec"]["max"] == 0.5
+    assert summary["start_lag_sec"]["min"] == 0.5
+    assert summary["spawn_lag_sec"]["max"] == 1.0
+    assert summary["spawn_jitter_sec"]["count"] == 2
+    assert summary["spawn_jitter_sec"]["max"] == 0.5
+
+
+def test_aggregate_files_runs_kept_apart(event_files, tmp_path):
+    """Test that separate runs never pair agents or sum concurrency."""
+    open_run = tmp_path / "open.ndjson"
+    open_run.write_text(
+        json.dumps({"event": "agent_start", "agent_id": 0, "time_sec": 1.0}) + "\n"
+    )
+    stop_run = tmp_path / "stop.ndjson"
+    stop_run.write_text(
+        json.dumps({"event": "agent_stop", "agent_id": 0, "time_sec": 9.0}) + "\n"
+    )
+
+    runs = aggregate_files([open_run, stop_run], workers=1, merge="runs")
+    assert runs.lifetimes.count == 0
+    assert len(runs.open_starts) == 1
+    assert len(runs.orphan_stops) == 1
+
+    paths = [event_files["json"], event_files["csv"]]
+    summary = aggregate_files(paths, workers=1, merge="runs").summary()
+    assert summary["peak_concurrency"] == 2
+    assert set(summary["runs"]) == {str(p) for p in paths}
+    assert all(r["peak_concurrency"] == 2 for r in summary["runs"].values())
+
+    shards = aggregate_files(paths, workers=1, merge="shards").summary()
+    assert shards["peak_concurrency"] == 4
+
+
+def test_summary_downsamples_concurrency():
+    """Test that long series are downsampled without losing the peak."""
+    agg = RunAggregator()
+    for i in range(1000):
+        agg.add({"event": "agent_start", "agent_id": i, "time_sec": float(i)})
+        agg.add({"event": "agent_stop", "agent_id": i, "time_sec": i + 0.5})
+    agg.add({"event": "agent_start", "agent_id": "late", "time_sec": 2000.0})
+
+    summary = agg.summary(max_points=100)
+    assert len(summary["concurrency"]) <= 100
+    assert summary["peak_concurrency"] == 1
+    assert len(agg.summary(max_points=None)["concurrency"]) == 1001
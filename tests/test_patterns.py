@@ -15,16 +15,32 @@ def mock_sleep(monkeypatch):
     return mock
 
 
+@pytest.fixture
+def mock_time(monkeypatch):
+    """Freeze time.time so scheduled/dispatch times are predictable."""
+    monkeypatch.setattr(time, "time", MagicMock(return_value=100.0))
+
+
 def create_mock_workflow(num_agents):
     """Helper to create a mock workflow with a specific number of agents."""
     workflow = MagicMock()
+    workflow.nodes = {f"agent-{i}": MagicMock() for i in range(num_agents)}
     workflow.agents_list = [
-        {"id": f"agent_{i}", "entrypoint": MagicMock()} for i in range(num_agents)
+        {"id": name, "entrypoint": node.runnable}
+        for name, node in workflow.nodes.items()
     ]
     return workflow
 
 
-def test_spawn_pattern_all_at_once(mock_sleep):
+def scheduled_times(workflow):
+    """Return the scheduled_sec each agent was invoked with."""
+    return [
+        agent["entrypoint"].invoke.call_args.args[0]["scheduled_sec"]
+        for agent in workflow.agents_list
+    ]
+
+
+def test_spawn_pattern_all_at_once(mock_sleep, mock_time):
     """Test the 'all_at_once' spawn pattern."""
     mock_workflow = create_mock_workflow(10)
     config = {
@@ -36,12 +52,14 @@ def test_spawn_pattern_all_at_once(mock_sleep):
 
     # Assert all agent entrypoints were called once
     for agent in mock_workflow.agents_list:
-        agent["entrypoint"].assert_called_once_with({})
+        agent["entrypoint"].invoke.assert_called_once_with(
+            {"scheduled_sec": 100.0, "dispatch_sec": 100.0}
+        )
 
     mock_sleep.assert_not_called()
 
 
-def test_spawn_pattern_bursts(mock_sleep):
+def test_spawn_pattern_bursts(mock_sleep, mock_time):
     """Test the 'bursts' spawn pattern."""
     mock_workflow = create_mock_workflow(10)
     config = {
@@ -56,7 +74,11 @@ def test_spawn_pattern_bursts(mock_sleep):
 
     # Assert all agent entrypoints were called
     for agent in mock_workflow.agents_list:
-        agent["entrypoint"].assert_called_once_with({})
+        agent["entrypoint"].invoke.assert_called_once()
+
+    # Each burst is scheduled one interval after the previous one
+    expected = [100.0] * 3 + [101.0] * 3 + [102.0] * 3 + [103.0]
+    assert scheduled_times(mock_workflow) == expected
 
     # Assert time.sleep was called correctly
     # 10 agents, 3 per burst -> 4 bursts -> 4 sleeps
@@ -64,7 +86,7 @@ def test_spawn_pattern_bursts(mock_sleep):
     mock_sleep.assert_has_calls([call(1), call(1), call(1), call(1)])
 
 
-def test_spawn_pattern_linear(mock_sleep):
+def test_spawn_pattern_linear(mock_sleep, mock_time):
     """Test the 'linear' spawn pattern."""
     mock_workflow = create_mock_workflow(5)
     config = {
@@ -79,14 +101,33 @@ def test_spawn_pattern_linear(mock_sleep):
 
     # Assert all agent entrypoints were called
     for agent in mock_workflow.agents_list:
-        agent["entrypoint"].assert_called_once_with({})
+        agent["entrypoint"].invoke.assert_called_once()
+
+    assert scheduled_times(mock_workflow) == [100.0, 102.0, 104.0, 106.0, 108.0]
 
     # 5 agents over 10s = 2s interval
     assert mock_sleep.call_count == 5
     mock_sleep.assert_has_calls([call(2.0), call(2.0), call(2.0), call(2.0), call(2.0)])
 
 
-def test_spawn_pattern_unknown(mock_sleep):
+def test_spawn_pattern_linear_start_offset(mock_sleep, mock_time):
+    """Test that linear scheduled times are offset by start_time_sec."""
+    mock_workflow = create_mock_workflow(4)
+    config = {
+        "pattern": {
+            "type": "linear",
+            "params": {"start_time_sec": 5, "stop_time_sec": 13},
+        },
+        "num_agents": 4,
+    }
+
+    spawn_pattern(mock_workflow, config)
+
+    # 4 agents over 8s = 2s interval, first one due 5s after spawn start
+    assert scheduled_times(mock_workflow) == [105.0, 107.0, 109.0, 111.0]
+
+
+def test_spawn_pattern_unknown(mock_sleep, mock_time):
     """Test that an unknown pattern defaults to 'all_at_once'."""
     mock_workflow = create_mock_workflow(5)
     config = {
@@ -98,6 +139,8 @@ def test_spawn_pattern_unknown(mock_sleep):
 
     # Assert all agents were called
     for agent in mock_workflow.agents_list:
-        agent["entrypoint"].assert_called_once_with({})
+        agent["entrypoint"].invoke.assert_called_once_with(
+            {"scheduled_sec": 100.0, "dispatch_sec": 100.0}
+        )
 
     mock_sleep.assert_not_called()
@@ -0,0 +1,302 @@
+# tests/test_sandbox.py
+import errno
+import json
+import os
+import signal
+import sys
+import time
+import types
+
+import psutil
+import pytest
+
+from stress.sandbox import (
+    CgroupLimits,
+    CgroupUnavailable,
+    _read_kv,
+    classify_exit,
+    run_isolated,
+)
+
+
+def test_classify_exit():
+    """Test mapping child exit codes to outcomes."""
+    assert classify_exit(0) == "completed"
+    assert classify_exit(3) == "memory_limit"
+    assert classify_exit(4, limits={"max_procs": 64}) == "proc_limit"
+    assert classify_exit(4, limits={"memory_mb": 256}) == "memory_limit"
+    assert classify_exit(4) == "failed"
+    # In cgroup mode pids.max must actually have been reached
+    both = {"max_procs": 64, "memory_mb": 256}
+    assert classify_exit(4, limits=both, pids_max_events=0) == "memory_limit"
+    assert classify_exit(4, limits=both, pids_max_events=2) == "proc_limit"
+    assert classify_exit(-signal.SIGKILL, oom_kills=1) == "oom_killed"
+    assert classify_exit(-signal.SIGKILL) == "killed"
+    assert classify_exit(1) == "failed"
+
+
+def test_cgroup_counters(tmp_path):
+    """Test reading OOM and throttling counters from cgroup files."""
+    cgroup = CgroupLimits(memory_mb=64)
+    cgroup.path = tmp_path
+    (tmp_path / "memory.events").write_text(
+        "low 0\nhigh 0\nmax 4\noom 1\noom_kill 1\n"
+    )
+    (tmp_path / "cpu.stat").write_text(
+        "nr_periods 10\nnr_throttled 6\nthrottled_usec 2500000\n"
+    )
+    (tmp_path / "memory.peak").write_text(str(64 << 20))
+
+    counters = cgroup.counters()
+    assert counters["oom_kills"] == 1
+    assert counters["memory_max_events"] == 4
+    assert counters["cpu_throttled_periods"] == 6
+    assert counters["cpu_throttled_sec"] == 2.5
+    assert counters["memory_peak_mb"] == 64
+    assert _read_kv(tmp_path / "missing") == {}
+
+
+@pytest.fixture
+def cgroup_tree(tmp_path, monkeypatch):
+    """A fake /sys/fs/cgroup where we live in a non-root group with processes."""
+    root = tmp_path / "cgroup"
+    own = root / "user.slice" / "app.scope"
+    own.mkdir(parents=True)
+    (root / "cgroup.controllers").write_text("cpu memory pids\n")
+    (root / "cgroup.subtree_control").write_text("\n")
+    (own / "cgroup.procs").write_text(f"{os.getpid()}\n")
+    monkeypatch.setattr("stress.sandbox.CGROUP_ROOT", root)
+    monkeypatch.setattr("stress.sandbox._own_cgroup", lambda: "/user.slice/app.scope")
+    return root
+
+
+def test_cgroup_limits_under_delegating_ancestor(cgroup_tree):
+    """Test that the group goes under the ancestor that delegates controllers."""
+    slice_dir = cgroup_tree / "user.slice"
+    (slice_dir / "cgroup.subtree_control").write_text("cpu memory pids\n")
+
+    cgroup = CgroupLimits(memory_mb=512, cpus=1.5, max_procs=64)
+    cgroup.create()
+
+    assert cgroup.path == slice_dir / f"swarm-stress-{os.getpid()}"
+    assert (cgroup.path / "memory.max").read_text() == str(512 << 20)
+    assert (cgroup.path / "cpu.max").read_text() == "150000 100000"
+    assert (cgroup.path / "pids.max").read_text() == "64"
+
+
+def test_cgroup_limits_enable_controllers_at_root(cgroup_tree):
+    """Test that controllers enabled at the root are disabled on removal."""
+    (cgroup_tree / "cgroup.subtree_control").write_text("memory\n")
+    cgroup = CgroupLimits(memory_mb=256, cpus=2)
+    cgroup.create()
+
+    assert (cgroup_tree / "cgroup.subtree_control").read_text() == "+cpu"
+    assert cgroup.path == cgroup_tree / f"swarm-stress-{os.getpid()}"
+    assert (cgroup.path / "memory.max").read_text() == str(256 << 20)
+    assert (cgroup.path / "cpu.max").read_text() == "200000 100000"
+
+    # The kernel drops interface files with the group; a tmp dir does not
+    for f in cgroup.path.iterdir():
+        f.unlink()
+    cgroup.remove()
+    assert not cgroup.path.exists()
+    assert (cgroup_tree / "cgroup.subtree_control").read_text() == "-cpu"
+
+
+def test_run_isolated_cgroup_mode_does_not_fall_back(cgroup_tree, tmp_path):
+    """Test that mode 'cgroup' raises when the controllers are unavailable."""
+    (cgroup_tree / "cgroup.controllers").write_text("memory\n")
+    config = {
+        "log_dir": str(tmp_path),
+        "isolation": {"mode": "cgroup", "memory_mb": 256, "cpus": 1},
+    }
+
+    with pytest.raises(CgroupUnavailable):
+        run_isolated(config)
+    assert not list(cgroup_tree.glob("swarm-stress-*"))
+
+
+@pytest.fixture
+def fake_swarm_app(monkeypatch):
+    """Replace run_swarm with one that starts agents and then allocates or fails."""
+
+    def run_swarm(config, on_event=None):
+        for i in range(3):
+            on_event({"event": "agent_start", "agent_id": i})
+        on_event({"event": "agent_stop", "agent_id": 0})
+        time.sleep(config.get("sleep", 0))
+        if "error" in config:
+            raise config["error"]
+        hog = bytearray(config["alloc_mb"] << 20)  # noqa
+
+    module = types.ModuleType("stress.swarm_app")
+    module.run_swarm = run_swarm
+    monkeypatch.setitem(sys.modules, "stress.swarm_app", module)
+
+
+def test_run_isolated_rlimit_memory(fake_swarm_app, tmp_path):
+    """Test that hitting RLIMIT_AS is detected and the agent count recorded."""
+    vms_mb = psutil.Process().memory_info().vms >> 20
+    config = {
+        "log_dir": str(tmp_path),
+        "alloc_mb": vms_mb + 1024,
+        "isolation": {
+            "mode": "rlimit",
+            "memory_mb": vms_mb + 256,
+            "sample_interval": 0.05,
+        },
+    }
+
+    report = run_isolated(config)
+
+    assert report["outcome"] == "memory_limit"
+    assert report["mode"] == "rlimit"
+    assert report["agents_started"] == 3
+    saved = list(tmp_path.glob("sandbox_*.json"))
+    assert len(saved) == 1
+    assert json.loads(saved[0].read_text())["outcome"] == "memory_limit"
+
+
+def test_run_isolated_auto_falls_back(fake_swarm_app, cgroup_tree, tmp_path):
+    """Test that mode 'auto' uses rlimits when no cgroup can be set up."""
+    (cgroup_tree / "cgroup.controllers").write_text("\n")
+    config = {
+        "log_dir": str(tmp_path),
+        "alloc_mb": 1,
+        "isolation": {"mode": "auto", "sample_interval": 0.05},
+    }
+
+    report = run_isolated(config)
+
+    assert report["mode"] == "rlimit"
+    assert report["outcome"] == "completed"
+
+
+def test_run_isolated_completed(fake_swarm_app, tmp_path):
+    """Test a run that stays within its limits."""
+    config = {
+        "log_dir": str(tmp_path),
+        "alloc_mb": 1,
+        "isolation": {"mode": "rlimit", "sample_interval": 0.05},
+    }
+
+    report = run_isolated(config)
+
+    assert report["outcome"] == "completed"
+    assert report["limit_hit"] is None
+
+
+NO_THREAD = RuntimeError("can't start new thread")
+EAGAIN = BlockingIOError(errno.EAGAIN, "Resource temporarily unavailable")
+PROCS = {"max_procs": 4096}
+MEMORY = {"memory_mb": 1 << 20}  # generous, the error is raised regardless
+
+
+@pytest.mark.parametrize(
+    "error, limits, outcome",
+    [
+        (NO_THREAD, PROCS, "proc_limit"),
+        (EAGAIN, PROCS, "proc_limit"),
+        # A thread stack can exhaust RLIMIT_AS when only memory is limited
+        (NO_THREAD, MEMORY, "memory_limit"),
+        (EAGAIN, MEMORY, "failed"),
+        (ValueError("boom"), {}, "failed"),
+    ],
+)
+def test_run_isolated_spawn_failure(fake_swarm_app, tmp_path, error, limits, outcome):
+    """Test that thread/process failures are attributed to the configured limit."""
+    config = {
+        "log_dir": str(tmp_path),
+        "error": error,
+        "isolation": {"mode": "rlimit", "sample_interval": 0.05, **limits},
+    }
+
+    report = run_isolated(config)
+
+    assert report["outcome"] == outcome
+    if outcome != "failed":
+        assert report["limit_hit"] is not None
+    else:
+        assert report["limit_hit"] is None
+
+
+def test_run_isolated_cleans_up_on_interrupt(fake_swarm_app, tmp_path, monkeypatch):
+    """Test that an interrupted parent stops the child and still reports."""
+
+    def interrupt(proc):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr("stress.sandbox._tree_rss_mb", interrupt)
+    config = {
+        "log_dir": str(tmp_path),
+        "sleep": 60,
+        "isolation": {"mode": "rlimit", "sample_interval": 0.05},
+    }
+
+    with pytest.raises(KeyboardInterrupt):
+        run_isolated(config)
+
+    assert not psutil.Process().children()
+    saved = list(tmp_path.glob("sandbox_*.json"))
+    assert json.loads(saved[0].read_text())["outcome"] == "interrupted"
+
+
+@pytest.fixture
+def delegated_cgroup_tree(cgroup_tree, monkeypatch):
+    """A fake tree that delegates controllers but refuses to move processes."""
+    slice_dir = cgroup_tree / "user.slice"
+    (slice_dir / "cgroup.subtree_control").write_text("memory\n")
+    removed = []
+
+    def join(self, pid):
+        raise PermissionError(13, "Permission denied")
+
+    monkeypatch.setattr(CgroupLimits, "join", join)
+    monkeypatch.setattr(CgroupLimits, "remove", lambda self: removed.append(self))
+    return removed
+
+
+def test_run_isolated_join_failure_falls_back(
+    fake_swarm_app, delegated_cgroup_tree, tmp_path
+):
+    """Test that mode 'auto' falls back to rlimits when the move fails."""
+    config = {
+        "log_dir": str(tmp_path),
+        "alloc_mb": 1,
+        "isolation": {"mode": "auto", "sample_interval": 0.05},
+    }
+
+    report = run_isolated(config)
+
+    assert report["mode"] == "rlimit"
+    assert report["outcome"] == "completed"
+    assert len(delegated_cgroup_tree) == 1
+
+
+def test_run_isolated_join_failure_cgroup_mode(
+    fake_swarm_app, delegated_cgroup_tree, tmp_path
+):
+    """Test that mode 'cgroup' raises, stops the child and removes the group."""
+    config = {
+        "log_dir": str(tmp_path),
+        "sleep": 60,
+        "isolation": {"mode": "cgroup", "sample_interval": 0.05},
+    }
+
+    with pytest.raises(CgroupUnavailable):
+        run_isolated(config)
+
+    assert not psutil.Process().children()
+    assert len(delegated_cgroup_tree) == 1
+    assert not list(tmp_path.glob("sandbox_*.json"))
+
+
+def test_run_isolated_isolation_none(fake_swarm_app, tmp_path, monkeypatch):
+    """Test that the default config's "isolation": None runs unrestricted."""
+    monkeypatch.setattr("stress.sandbox.CGROUP_ROOT", tmp_path / "no-cgroup")
+    config = {"log_dir": str(tmp_path), "alloc_mb": 1, "isolation": None}
+
+    report = run_isolated(config)
+
+    assert report["outcome"] == "completed"
+    assert report["limits"] == {}